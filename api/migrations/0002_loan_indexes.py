@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-15 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], name='api_loan_custome_775ef5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date'], name='api_loan_custome_9507c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'is_approved', 'end_date'], name='api_loan_custome_62a1d0_idx'),
+        ),
+    ]
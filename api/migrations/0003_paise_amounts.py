@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-15 01:12
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+
+def backfill_paise(apps, schema_editor):
+    Customer = apps.get_model('api', 'Customer')
+    Loan = apps.get_model('api', 'Loan')
+
+    def paise(field):
+        return Cast(Round(F(field) * 100), models.BigIntegerField())
+
+    Customer.objects.update(
+        monthly_salary_paise=paise('monthly_salary'),
+        approved_limit_paise=paise('approved_limit'),
+    )
+    Loan.objects.update(
+        loan_amount_paise=paise('loan_amount'),
+        monthly_repayment_paise=paise('monthly_repayment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_loan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='approved_limit_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='monthly_salary_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='monthly_repayment_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_paise, migrations.RunPython.noop),
+    ]
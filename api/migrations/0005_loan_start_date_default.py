@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-15 01:19
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_customer_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loan',
+            name='start_date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
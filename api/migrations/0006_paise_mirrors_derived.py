@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-15 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_loan_start_date_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='approved_limit_paise',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='monthly_salary_paise',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='loan_amount_paise',
+            field=models.BigIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='monthly_repayment_paise',
+            field=models.BigIntegerField(editable=False),
+        ),
+    ]
@@ -1,6 +1,30 @@
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
 from django.db import models
+from django.utils import timezone
 
-class Customer(models.Model):
+
+def to_paise(amount):
+    # Rupees (int, float, str or Decimal) -> integer paise
+    return int((Decimal(str(amount)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+class PaiseMirrorMixin:
+    # Maps each rupee DecimalField to its integer paise mirror. save() derives
+    # the mirrors so the two representations cannot drift; QuerySet.update()
+    # and bulk_create() skip save() and must set the mirrors themselves.
+    PAISE_MIRRORS = {}
+
+    def save(self, *args, **kwargs):
+        for field, mirror in self.PAISE_MIRRORS.items():
+            setattr(self, mirror, to_paise(getattr(self, field)))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.PAISE_MIRRORS.values()}
+        return super().save(*args, **kwargs)
+
+
+class Customer(PaiseMirrorMixin, models.Model):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     age = models.IntegerField()
@@ -8,14 +32,68 @@ class Customer(models.Model):
     monthly_salary = models.DecimalField(max_digits=15, decimal_places=2)
     approved_limit = models.DecimalField(max_digits=15, decimal_places=2)
     current_debt = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    # Integer paise mirrors of the rupee amounts, used for aggregates and checks
+    monthly_salary_paise = models.BigIntegerField(editable=False)
+    approved_limit_paise = models.BigIntegerField(editable=False)
+    # Bumped whenever one of the customer's loans changes; keys the loan stats cache
+    updated_at = models.DateTimeField(auto_now=True)
+
+    PAISE_MIRRORS = {
+        'monthly_salary': 'monthly_salary_paise',
+        'approved_limit': 'approved_limit_paise',
+    }
+
+def touch_customers(customer_ids):
+    # Bump updated_at, which versions the customer's cached loan stats
+    Customer.objects.filter(pk__in=customer_ids).update(updated_at=timezone.now())
 
-class Loan(models.Model):
+
+class LoanQuerySet(models.QuerySet):
+    # Bulk writes skip the post_save/post_delete receivers in api.signals, so
+    # they invalidate the affected customers' loan stats here instead
+    def update(self, **kwargs):
+        customer_ids = set(self.values_list('customer_id', flat=True))
+        rows = super().update(**kwargs)
+        if 'customer' in kwargs:
+            customer_ids.add(getattr(kwargs['customer'], 'pk', kwargs['customer']))
+        if 'customer_id' in kwargs:
+            customer_ids.add(kwargs['customer_id'])
+        touch_customers(customer_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        touch_customers({obj.customer_id for obj in objs})
+        return objs
+
+
+class Loan(PaiseMirrorMixin, models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
     loan_amount = models.DecimalField(max_digits=15, decimal_places=2)
     tenure = models.IntegerField()
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
     monthly_repayment = models.DecimalField(max_digits=15, decimal_places=2)
     emis_paid_on_time = models.IntegerField(default=0)
-    start_date = models.DateField(auto_now_add=True)
+    # Defaults to today for new loans; ingestion supplies the approval date
+    start_date = models.DateField(default=date.today)
     end_date = models.DateField()
-    is_approved = models.BooleanField(default=False)
\ No newline at end of file
+    is_approved = models.BooleanField(default=False)
+    # Integer paise mirrors of the rupee amounts, used for aggregates
+    loan_amount_paise = models.BigIntegerField(editable=False)
+    monthly_repayment_paise = models.BigIntegerField(editable=False)
+
+    PAISE_MIRRORS = {
+        'loan_amount': 'loan_amount_paise',
+        'monthly_repayment': 'monthly_repayment_paise',
+    }
+
+    objects = LoanQuerySet.as_manager()
+
+    class Meta:
+        # Eligibility and credit-score lookups filter a customer's loans by
+        # end date, start date and approval status
+        indexes = [
+            models.Index(fields=['customer', 'end_date']),
+            models.Index(fields=['customer', 'start_date']),
+            models.Index(fields=['customer', 'is_approved', 'end_date']),
+        ]
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Loan, touch_customers
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def touch_customer(sender, instance, **kwargs):
+    # A loan change invalidates the customer's cached loan stats
+    touch_customers([instance.customer_id])
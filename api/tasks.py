@@ -1,53 +1,221 @@
 from celery import shared_task
+import io
+import numpy as np
+import openpyxl
 import pandas as pd
-from .models import Customer, Loan
+import queue
+import threading
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Customer, Loan, touch_customers
 import os
 
+CUSTOMER_BATCH_SIZE = 10000
+LOAN_BATCH_SIZE = 5000
+
+# Excel header -> Customer field
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'id',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Age': 'age',
+    'Phone Number': 'phone_number',
+    'Monthly Salary': 'monthly_salary',
+}
+
+# Excel header -> Loan field
+LOAN_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'Loan Amount': 'loan_amount',
+    'Tenure': 'tenure',
+    'Interest Rate': 'interest_rate',
+    'Monthly payment': 'monthly_repayment',
+    'EMIs paid on Time': 'emis_paid_on_time',
+    'Date of Approval': 'start_date',
+    'End Date': 'end_date',
+}
+
+
+def copy_from_dataframe(model, df):
+    # Stream the DataFrame into the model's table with Postgres COPY.
+    # DataFrame columns must already be named after the model fields.
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    columns = ','.join(model._meta.get_field(name).column for name in df.columns)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {model._meta.db_table} ({columns}) FROM STDIN WITH CSV", buf
+        )
+
+
+def read_excel_chunks(path, chunk_size):
+    # Stream the first sheet as DataFrames of at most chunk_size rows, so
+    # memory is bounded by the batch rather than the whole workbook
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def insert_dataframe(model, df, batch_size):
+    if connection.vendor == 'postgresql':
+        copy_from_dataframe(model, df)
+    else:
+        # One multi-row INSERT per batch instead of one INSERT per row.
+        # Zip whole columns rather than walking the frame row by row.
+        columns = list(df.columns)
+        rows = zip(*(df[column].tolist() for column in columns))
+        model.objects.bulk_create(
+            [model(**dict(zip(columns, row))) for row in rows],
+            batch_size=batch_size,
+        )
+
+
+def prefetch(chunks, depth=2):
+    # Pull chunks on a background thread so parsing the next batch overlaps
+    # with inserting the current one. The queue bounds memory to `depth`
+    # batches. Only pure DataFrame work belongs here: DB access must stay on
+    # the caller's thread so it runs inside the task's transaction.
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put((chunk, None)):
+                    return
+        except Exception as exc:
+            put((None, exc))
+        else:
+            put((done, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk, error = buffer.get()
+            if error is not None:
+                raise error
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        stop.set()
+        producer.join()
+
+
+def prepare_customer_chunk(df):
+    df = df.rename(columns=CUSTOMER_COLUMNS)[list(CUSTOMER_COLUMNS.values())]
+    # Approved limit: 36 * salary, rounded to nearest lakh
+    df['approved_limit'] = (
+        np.round(36 * df['monthly_salary'].to_numpy() / 100000) * 100000
+    ).astype('int64')
+    df['current_debt'] = 0
+    df['monthly_salary_paise'] = np.round(df['monthly_salary'].to_numpy() * 100).astype('int64')
+    df['approved_limit_paise'] = df['approved_limit'] * 100
+    df['updated_at'] = timezone.now()
+    return df
+
+
+def prepare_loan_chunk(df):
+    df = df.rename(columns=LOAN_COLUMNS)[list(LOAN_COLUMNS.values())]
+    df['is_approved'] = True
+    df['loan_amount_paise'] = np.round(df['loan_amount'].to_numpy() * 100).astype('int64')
+    df['monthly_repayment_paise'] = np.round(df['monthly_repayment'].to_numpy() * 100).astype('int64')
+    return df
+
+
 @shared_task
+@transaction.atomic
 def ingest_customer_data():
     # Check if file exists
     if not os.path.exists('customer_data.xlsx'):
         print("Error: customer_data.xlsx not found!")
         return
 
-    df = pd.read_excel('customer_data.xlsx')
-    for _, row in df.iterrows():
-        # Calculate approved limit based on formula
-        limit = 36 * row['Monthly Salary']
-        limit = round(limit / 100000) * 100000
-
-        Customer.objects.create(
-            first_name=row['First Name'],
-            last_name=row['Last Name'],
-            age=row['Age'],
-            phone_number=row['Phone Number'],
-            monthly_salary=row['Monthly Salary'],
-            approved_limit=limit,
-            current_debt=0 
+    chunks = read_excel_chunks('customer_data.xlsx', CUSTOMER_BATCH_SIZE)
+    for df in prefetch(prepare_customer_chunk(df) for df in chunks):
+        # Customers keep their Excel ID, which loan_data.xlsx refers to, so a
+        # skipped row never shifts the IDs of the rows after it
+        stored = dict(
+            Customer.objects.filter(id__in=df['id'].tolist()).values_list('id', 'phone_number')
+        )
+        stored_phone = df['id'].map(stored)
+        clash = stored_phone.notna() & (stored_phone != df['phone_number'])
+        if clash.any():
+            raise ValueError(
+                f"Customer IDs already used by other customers: {df.loc[clash, 'id'].tolist()}"
+            )
+        # Rows already stored under the same ID are from an earlier run
+        df = df[stored_phone.isna()]
+
+        # Drop phone numbers that are repeated in the batch or stored under
+        # another ID (one query) so the unique constraint never aborts the load
+        existing = set(
+            Customer.objects.filter(phone_number__in=df['phone_number'].tolist())
+            .values_list('phone_number', flat=True)
         )
+        duplicate = df['phone_number'].isin(existing) | df['phone_number'].duplicated()
+        for customer_id, phone_number in zip(df.loc[duplicate, 'id'], df.loc[duplicate, 'phone_number']):
+            print(f"Skipping customer ID {customer_id} with duplicate phone number: {phone_number}")
+        df = df[~duplicate]
+
+        insert_dataframe(Customer, df, CUSTOMER_BATCH_SIZE)
+
+    # IDs were inserted explicitly, so move the sequence past them
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Customer]):
+            cursor.execute(sql)
     print("Customer Data Ingested Successfully")
 
 @shared_task
+@transaction.atomic
 def ingest_loan_data():
     if not os.path.exists('loan_data.xlsx'):
         print("Error: loan_data.xlsx not found!")
         return
 
-    df = pd.read_excel('loan_data.xlsx')
-    for _, row in df.iterrows():
-        try:
-            customer = Customer.objects.get(pk=row['Customer ID'])
-            Loan.objects.create(
-                customer=customer,
-                loan_amount=row['Loan Amount'],
-                tenure=row['Tenure'],
-                interest_rate=row['Interest Rate'],
-                monthly_repayment=row['Monthly payment'],
-                emis_paid_on_time=row['EMIs paid on time'],
-                start_date=row['Date of Approval'],
-                end_date=row['End Date'],
-                is_approved=True 
-            )
-        except Customer.DoesNotExist:
-            print(f"Skipping loan for unknown customer ID: {row['Customer ID']}")
-    print("Loan Data Ingested Successfully")
\ No newline at end of file
+    chunks = read_excel_chunks('loan_data.xlsx', LOAN_BATCH_SIZE)
+    for df in prefetch(prepare_loan_chunk(df) for df in chunks):
+        # Look up every referenced customer in a single query and drop
+        # loans for unknown IDs before inserting
+        valid_ids = set(
+            Customer.objects.filter(id__in=df['customer_id'].unique().tolist()).values_list('id', flat=True)
+        )
+        known = df['customer_id'].isin(valid_ids)
+        for customer_id in df.loc[~known, 'customer_id']:
+            print(f"Skipping loan for unknown customer ID: {customer_id}")
+        df = df[known]
+
+        insert_dataframe(Loan, df, LOAN_BATCH_SIZE)
+        # COPY bypasses the ORM entirely, so invalidate cached loan stats for
+        # the affected customers here
+        touch_customers(df['customer_id'].unique().tolist())
+    print("Loan Data Ingested Successfully")
@@ -1,3 +1,259 @@
-from django.test import TestCase
+from bisect import bisect_left
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+import os
+import tempfile
 
-# Create your tests here.
+import openpyxl
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import Customer, Loan, to_paise
+from .tasks import ingest_customer_data, ingest_loan_data
+from .views import (
+    MIN_INTEREST_RATES, SCORE_THRESHOLDS, calculate_emi, calculate_emi_paise, get_loan_stats,
+)
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_customer(**kwargs):
+    fields = {
+        'first_name': 'Asha',
+        'last_name': 'Rao',
+        'age': 30,
+        'phone_number': 9000000001,
+        'monthly_salary': 100000,
+        'approved_limit': 3600000,
+    }
+    fields.update(kwargs)
+    return Customer.objects.create(**fields)
+
+
+def make_loan(customer, **kwargs):
+    fields = {
+        'customer': customer,
+        'loan_amount': 100000,
+        'tenure': 12,
+        'interest_rate': 10,
+        'monthly_repayment': 8792,
+        'end_date': date.today() + timedelta(days=365),
+        'is_approved': True,
+    }
+    fields.update(kwargs)
+    return Loan.objects.create(**fields)
+
+
+class PaiseTests(SimpleTestCase):
+    def test_to_paise_rounds_half_up(self):
+        self.assertEqual(to_paise(Decimal('12.345')), 1235)
+        self.assertEqual(to_paise(Decimal('12.344')), 1234)
+
+    def test_to_paise_accepts_ints_floats_and_strings(self):
+        self.assertEqual(to_paise(50000), 5000000)
+        self.assertEqual(to_paise(8698.84), 869884)
+        self.assertEqual(to_paise('0.1'), 10)
+
+    def test_calculate_emi_paise(self):
+        self.assertEqual(calculate_emi_paise(100000, 12, 12), 888488)
+        self.assertEqual(calculate_emi_paise(Decimal('100000.00'), Decimal('12.00'), 12), 888488)
+
+    def test_calculate_emi_paise_zero_rate(self):
+        self.assertEqual(calculate_emi_paise(100000, 0, 12), 833333)
+
+    def test_calculate_emi_returns_rupees(self):
+        self.assertEqual(calculate_emi(100000, 12, 12), 8884.88)
+
+
+class ScoreSlabTests(SimpleTestCase):
+    def min_rate(self, score):
+        return MIN_INTEREST_RATES[bisect_left(SCORE_THRESHOLDS, score)]
+
+    def test_slab_boundaries(self):
+        self.assertIsNone(self.min_rate(10))
+        self.assertEqual(self.min_rate(11), 16)
+        self.assertEqual(self.min_rate(30), 16)
+        self.assertEqual(self.min_rate(31), 12)
+        self.assertEqual(self.min_rate(50), 12)
+        self.assertEqual(self.min_rate(51), 0)
+
+
+class PaiseMirrorTests(TestCase):
+    def test_create_derives_mirrors(self):
+        customer = make_customer(monthly_salary=Decimal('12345.67'), approved_limit=400000)
+        loan = make_loan(customer, loan_amount=Decimal('1000.50'), monthly_repayment=Decimal('99.99'))
+
+        customer.refresh_from_db()
+        loan.refresh_from_db()
+        self.assertEqual(customer.monthly_salary_paise, 1234567)
+        self.assertEqual(customer.approved_limit_paise, 40000000)
+        self.assertEqual(loan.loan_amount_paise, 100050)
+        self.assertEqual(loan.monthly_repayment_paise, 9999)
+
+    def test_save_with_update_fields_keeps_mirrors_in_sync(self):
+        customer = make_customer()
+        customer.monthly_salary = 20000
+        customer.save(update_fields=['monthly_salary'])
+
+        customer.refresh_from_db()
+        self.assertEqual(customer.monthly_salary_paise, 2000000)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EmiSalaryCheckTests(TestCase):
+    # A customer with no loans scores 30, so the requested rate is raised to 16%
+    def setUp(self):
+        self.client = APIClient()
+
+    def check(self, customer):
+        response = self.client.post('/api/check-eligibility', {
+            'customer_id': customer.id,
+            'loan_amount': 100000,
+            'interest_rate': 16,
+            'tenure': 12,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_approved_when_emis_within_half_salary(self):
+        data = self.check(make_customer(monthly_salary=100000))
+        self.assertTrue(data['approval'])
+        self.assertEqual(data['monthly_installment'], 9073.09)
+
+    def test_rejected_when_emi_exceeds_half_salary(self):
+        data = self.check(make_customer(monthly_salary=10000))
+        self.assertFalse(data['approval'])
+
+    def test_existing_emis_count_towards_the_limit(self):
+        customer = make_customer(monthly_salary=100000)
+        make_loan(customer, monthly_repayment=45000)
+        self.assertFalse(self.check(customer)['approval'])
+
+    def test_exactly_half_salary_is_approved(self):
+        customer = make_customer(monthly_salary=100000)
+        proposed = calculate_emi_paise(100000, 16, 12)
+        make_loan(customer, monthly_repayment=Decimal(5000000 - proposed) / 100)
+        self.assertTrue(self.check(customer)['approval'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LoanStatsCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = make_customer()
+
+    def fresh_stats(self):
+        # Re-read the customer, as each request does, to pick up updated_at
+        return get_loan_stats(Customer.objects.get(pk=self.customer.pk))
+
+    def test_create_loan_invalidates_cached_stats(self):
+        self.assertEqual(self.fresh_stats()['total'], 0)
+        response = self.client.post('/api/create-loan', {
+            'customer_id': self.customer.id,
+            'loan_amount': 100000,
+            'interest_rate': 12,
+            'tenure': 12,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.fresh_stats()['total'], 1)
+
+    def test_deleting_a_loan_invalidates_cached_stats(self):
+        loan = make_loan(self.customer)
+        self.assertEqual(self.fresh_stats()['total'], 1)
+        loan.delete()
+        self.assertEqual(self.fresh_stats()['total'], 0)
+
+    def test_queryset_update_invalidates_cached_stats(self):
+        make_loan(self.customer, is_approved=False)
+        self.assertIsNone(self.fresh_stats()['approved_volume'])
+        Loan.objects.filter(customer=self.customer).update(is_approved=True)
+        self.assertEqual(self.fresh_stats()['approved_volume'], 10000000)
+
+    def test_bulk_create_invalidates_cached_stats(self):
+        self.assertEqual(self.fresh_stats()['total'], 0)
+        Loan.objects.bulk_create([Loan(
+            customer=self.customer, loan_amount=1000, tenure=12, interest_rate=10,
+            monthly_repayment=88, end_date=date.today(),
+            loan_amount_paise=100000, monthly_repayment_paise=8800,
+        )])
+        self.assertEqual(self.fresh_stats()['total'], 1)
+
+    def test_cache_outage_falls_back_to_the_database(self):
+        make_loan(self.customer)
+        with mock.patch('api.views.cache') as cache, self.assertLogs('api.views', 'WARNING'):
+            cache.get.side_effect = ConnectionError
+            cache.set.side_effect = ConnectionError
+            response = self.client.post('/api/check-eligibility', {
+                'customer_id': self.customer.id,
+                'loan_amount': 100000,
+                'interest_rate': 16,
+                'tenure': 12,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class IngestionTests(TestCase):
+    CUSTOMER_HEADER = ('Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number',
+                       'Monthly Salary', 'Approved Limit')
+    LOAN_HEADER = ('Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate',
+                   'Monthly payment', 'EMIs paid on Time', 'Date of Approval', 'End Date')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        # Keep the tasks' progress output out of the test report
+        quiet = mock.patch('api.tasks.print', create=True)
+        quiet.start()
+        self.addCleanup(quiet.stop)
+
+    def write(self, path, header, rows):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+
+    def write_customers(self, rows):
+        self.write('customer_data.xlsx', self.CUSTOMER_HEADER, rows)
+
+    def test_customers_keep_their_excel_ids_when_a_row_is_skipped(self):
+        self.write_customers([
+            (1, 'Aaron', 'Garcia', 63, 9629317944, 50000, 1800000),
+            (2, 'Abbey', 'Wong', 40, 9629317944, 33000, 1200000),
+            (3, 'Adaline', 'Diaz', 65, 9519253076, 60000, 2200000),
+        ])
+        self.write('loan_data.xlsx', self.LOAN_HEADER, [
+            (3, 1001, 100000, 12, 10.0, 8792, 12, date(2017, 3, 9), date(2018, 3, 9)),
+            (2, 1002, 100000, 12, 10.0, 8792, 12, date(2017, 3, 9), date(2018, 3, 9)),
+        ])
+
+        ingest_customer_data()
+        ingest_loan_data()
+
+        self.assertEqual(sorted(Customer.objects.values_list('id', flat=True)), [1, 3])
+        self.assertEqual(Customer.objects.get(pk=3).first_name, 'Adaline')
+        loan = Loan.objects.get()
+        self.assertEqual(loan.customer_id, 3)
+        self.assertEqual(loan.start_date, date(2017, 3, 9))
+
+    def test_rerunning_customer_ingestion_is_a_no_op(self):
+        self.write_customers([(1, 'Aaron', 'Garcia', 63, 9629317944, 50000, 1800000)])
+        ingest_customer_data()
+        ingest_customer_data()
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_id_taken_by_another_customer_aborts(self):
+        make_customer(id=1, phone_number=9000000001)
+        self.write_customers([(1, 'Aaron', 'Garcia', 63, 9629317944, 50000, 1800000)])
+        with self.assertRaises(ValueError):
+            ingest_customer_data()
+
+    def test_new_customers_are_numbered_after_ingested_ids(self):
+        self.write_customers([(40, 'Aaron', 'Garcia', 63, 9629317944, 50000, 1800000)])
+        ingest_customer_data()
+        self.assertEqual(make_customer().id, 41)
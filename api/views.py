@@ -1,57 +1,102 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Customer, Loan
+from .models import Customer, Loan, to_paise
 from .serializers import CustomerSerializer, LoanSerializer
+from bisect import bisect_left
 from datetime import date
-from django.db import models
+from functools import lru_cache
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+import logging
 import math
 
+logger = logging.getLogger(__name__)
+
 
 # --- HELPER FUNCTIONS ---
 
-def calculate_emi(principal, rate, tenure):
-    # Standard EMI formula with monthly compounding
+@lru_cache(maxsize=4096)
+def _emi(principal, rate, tenure):
+    # Standard EMI formula with monthly compounding, in integer paise
     # Rate is annual %, so divide by 12 and 100
     r = rate / (12 * 100)
     n = tenure # tenure in months
     
     if r == 0:
-        return principal / n
+        return round(principal / n)
         
-    emi = (principal * r * pow(1 + r, n)) / (pow(1 + r, n) - 1)
-    return round(emi, 2)
+    growth = (1 + r) ** n
+    emi = principal * r * growth / (growth - 1)
+    return round(emi)
+
+def calculate_emi_paise(principal, rate, tenure):
+    # Normalise inputs (ints, floats or Decimals) so repeated quotes hit the cache
+    return _emi(to_paise(principal), float(rate), int(tenure))
+
+def calculate_emi(principal, rate, tenure):
+    return calculate_emi_paise(principal, rate, tenure) / 100
 
-def calculate_credit_score(customer):
+LOAN_STATS_CACHE_TTL = 300 # seconds
+
+def get_loan_stats(customer, today=None):
+    # Summarise all past loans in a single query; feeds both the
+    # credit score and the EMI check in CheckEligibility
+    if today is None:
+        today = date.today()
+
+    # customer.updated_at moves on every loan change, so stale entries are never read
+    version = int(customer.updated_at.timestamp() * 1000000)
+    key = f"loan-stats:{customer.id}:{version}:{today.isoformat()}"
+    try:
+        stats = cache.get(key)
+    except Exception:
+        # The cache is an optimisation; fall through to the query if it is down
+        logger.warning("Loan stats cache unavailable", exc_info=True)
+        stats = None
+    if stats is not None:
+        return stats
+
+    active = Q(is_approved=True, end_date__gte=today)
+    stats = Loan.objects.filter(customer=customer).aggregate(
+        total=Count('id'),
+        on_time=Count('id', filter=Q(emis_paid_on_time__gte=F('tenure'))), # Simplified logic
+        this_year=Count('id', filter=Q(start_date__year=today.year)),
+        approved_volume=Sum('loan_amount_paise', filter=Q(is_approved=True)),
+        active_debt=Sum('loan_amount_paise', filter=active),
+        current_emis_sum=Sum('monthly_repayment_paise', filter=active),
+    )
+    try:
+        cache.set(key, stats, LOAN_STATS_CACHE_TTL)
+    except Exception:
+        logger.warning("Loan stats cache unavailable", exc_info=True)
+    return stats
+
+def calculate_credit_score(customer, stats=None, today=None):
     # Start with a base score
     score = 0
     
-    # Get all past loans
-    loans = Loan.objects.filter(customer=customer)
-    total_loans = loans.count()
+    if stats is None:
+        stats = get_loan_stats(customer, today)
     
     # 1. Past Loans paid on time
-    paid_on_time_loans = loans.filter(emis_paid_on_time__gte=models.F('tenure')).count() # Simplified logic
-    if paid_on_time_loans > 0:
+    if stats['on_time'] > 0:
         score += 20
 
     # 2. Number of loans taken in past
-    if total_loans > 0:
+    if stats['total'] > 0:
         score += 10
     
     # 3. Loan activity in current year
-    current_year_loans = loans.filter(start_date__year=date.today().year).count()
-    if current_year_loans > 0:
+    if stats['this_year'] > 0:
         score += 10
 
     # 4. Loan approved volume
-    total_approved_volume = sum([l.loan_amount for l in loans if l.is_approved])
-    if total_approved_volume > 100000:
+    if (stats['approved_volume'] or 0) > 100000 * 100:
         score += 10
     
     # If sum of current loans > approved limit, score is 0
-    current_debt = sum([l.loan_amount for l in loans if l.is_approved and l.end_date >= date.today()])
-    if current_debt > customer.approved_limit:
+    if (stats['active_debt'] or 0) > customer.approved_limit_paise:
         score = 0
     else:
         # Give a base score if debt is within limit
@@ -59,6 +104,11 @@ def calculate_credit_score(customer):
         
     return score
 
+# Credit score slabs: score <= 10 is rejected, (10, 30] needs at least 16%,
+# (30, 50] at least 12%, and above 50 any rate is accepted
+SCORE_THRESHOLDS = (10, 30, 50)
+MIN_INTEREST_RATES = (None, 16, 12, 0)
+
 # --- API VIEWS ---
 
 class RegisterCustomer(APIView):
@@ -101,34 +151,28 @@ class CheckEligibility(APIView):
             return Response({"error": "Customer not found"}, status=404)
             
         # 1. Calculate Credit Score
-        credit_score = calculate_credit_score(customer) # Using the helper above
+        # One "today" for the whole check, so every part agrees across midnight
+        today = date.today()
+        stats = get_loan_stats(customer, today)
+        credit_score = calculate_credit_score(customer, stats) # Using the helper above
         
         # 2. Determine Approval & Interest Rate
-        approval = False
+        min_rate = MIN_INTEREST_RATES[bisect_left(SCORE_THRESHOLDS, credit_score)]
+        approval = min_rate is not None
         corrected_interest_rate = interest_rate
-        
-        if credit_score > 50:
-            approval = True
-        elif 50 >= credit_score > 30:
-            approval = True
-            if interest_rate < 12:
-                corrected_interest_rate = 12
-        elif 30 >= credit_score > 10:
-            approval = True
-            if interest_rate < 16:
-                corrected_interest_rate = 16
-        else:
-            approval = False
+        if approval and interest_rate < min_rate:
+            corrected_interest_rate = min_rate
             
         # 3. Check EMI vs Salary constraint
         # Calculate EMI for requested loan
-        proposed_emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
+        proposed_emi_paise = calculate_emi_paise(loan_amount, corrected_interest_rate, tenure)
+        proposed_emi = proposed_emi_paise / 100
         
-        # Sum of current EMIs
-        current_loans = Loan.objects.filter(customer=customer, is_approved=True, end_date__gte=date.today())
-        current_emis_sum = sum([l.monthly_repayment for l in current_loans])
+        # Sum of current EMIs (already aggregated above)
+        current_emis_sum = stats['current_emis_sum'] or 0
         
-        if (current_emis_sum + proposed_emi) > (0.5 * float(customer.monthly_salary)):
+        # EMIs must stay within half of the monthly salary
+        if 2 * (current_emis_sum + proposed_emi_paise) > customer.monthly_salary_paise:
             approval = False
             
         return Response({
@@ -155,7 +199,8 @@ class CreateLoan(APIView):
         except Customer.DoesNotExist:
             return Response({"error": "Customer not found"}, status=404)
 
-        emi = calculate_emi(loan_amount, interest_rate, tenure)
+        emi_paise = calculate_emi_paise(loan_amount, interest_rate, tenure)
+        emi = emi_paise / 100
         
         # Create the Loan
         loan = Loan.objects.create(
@@ -180,7 +225,7 @@ class CreateLoan(APIView):
 class ViewLoan(APIView):
     def get(self, request, loan_id):
         try:
-            loan = Loan.objects.get(id=loan_id)
+            loan = Loan.objects.select_related('customer').get(id=loan_id)
             customer = loan.customer
             return Response({
                 "loan_id": loan.id,
@@ -201,14 +246,15 @@ class ViewLoan(APIView):
 
 class ViewCustomerLoans(APIView):
     def get(self, request, customer_id):
-        loans = Loan.objects.filter(customer_id=customer_id)
-        data = []
-        for loan in loans:
-            data.append({
-                "loan_id": loan.id,
-                "loan_amount": loan.loan_amount,
-                "interest_rate": loan.interest_rate,
-                "monthly_installment": loan.monthly_repayment,
-                "repayments_left": loan.tenure - loan.emis_paid_on_time
-            })
+        # Only the columns the response needs, as plain tuples
+        loans = Loan.objects.filter(customer_id=customer_id).values_list(
+            'id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'tenure', 'emis_paid_on_time'
+        )
+        data = [{
+            "loan_id": loan_id,
+            "loan_amount": loan_amount,
+            "interest_rate": interest_rate,
+            "monthly_installment": monthly_repayment,
+            "repayments_left": tenure - emis_paid_on_time
+        } for loan_id, loan_amount, interest_rate, monthly_repayment, tenure, emis_paid_on_time in loans]
         return Response(data)
\ No newline at end of file